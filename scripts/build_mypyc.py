@@ -0,0 +1,29 @@
+"""
+Optional native build of the sync planner with mypyc:
+
+    pip install mypy setuptools
+    python scripts/build_mypyc.py
+
+The extension is written next to src/vault_sync.py and is imported in its place.
+Without it, or if it was built for another interpreter, the pure-Python module is used.
+
+The extension is a snapshot: after editing src/vault_sync.py, rerun this script or
+delete src/vault_sync.*.so, otherwise the stale build silently shadows the source.
+Host builds are kept out of the Docker image by .dockerignore.
+"""
+
+import os
+
+from mypyc.build import mypycify
+from setuptools import setup
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if __name__ == "__main__":
+    os.chdir(ROOT)
+    setup(
+        package_dir={"": "src"},
+        py_modules=[],
+        ext_modules=mypycify(["--follow-imports=silent", "src/vault_sync.py"]),
+        script_args=["build_ext", "--inplace"],
+    )
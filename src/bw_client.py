@@ -1,12 +1,39 @@
-import os
-import subprocess
+import asyncio
+import http.client
 import json
 import logging
+import os
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from collections.abc import Awaitable, Callable, Iterator
 from typing import Any
 
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:  # orjson is optional; fall back to the stdlib
+    _json_loads = json.loads
+
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+try:
+    import ijson
+except ImportError:  # ijson is optional; list_items is used instead of streaming
+    ijson = None
+
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
+SERVE_HOST = "127.0.0.1"
+SERVE_STARTUP_TIMEOUT = 60.0
+SERVE_REQUEST_TIMEOUT = 300.0
+
 
 class BitwardenError(Exception):
     """Base exception for Bitwarden wrapper."""
@@ -35,12 +62,21 @@ class BitwardenClient:
         :param use_api_key: Whether to use API key login if client_id and client_secret are provided (Default to True)
         """
         self.bw_cmd = bw_cmd
+        self.server = server
         self.session = session
         self.client_id = client_id
         self.client_secret = client_secret
         self.use_api_key = (
             use_api_key and client_id is not None and client_secret is not None
         )
+        # Environment shared by CLI calls for the current session
+        self._env: dict[str, str] | None = None
+        # Long-lived `bw serve` daemon used for item operations
+        self._serve_proc: subprocess.Popen | None = None
+        self._serve_port: int | None = None
+        self._serve_lock = threading.Lock()
+        # Idle keep-alive connections to the daemon, so concurrent requests never share a socket
+        self._idle: list[http.client.HTTPConnection] = []
         if server:
             logger.debug(f"Configuring BW server: {server}")
             env = os.environ.copy()  # do not add BW_SESSION
@@ -64,44 +100,206 @@ class BitwardenClient:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
         self.logout()
 
+    def _session_env(self) -> dict[str, str]:
+        """
+        Return os.environ plus BW_SESSION, built once per session.
+        subprocess only reads the mapping, so it is safe to share between calls.
+        """
+        if self._env is None or self._env.get("BW_SESSION") != self.session:
+            self._env = {**os.environ, "BW_SESSION": self.session} if self.session else dict(os.environ)
+        return self._env
+
     def _run(self, cmd: list[str], capture_json: bool = True) -> Any:
         """
         Run a bw CLI command safely.
         :param cmd: list of arguments, e.g., ["list", "items"]
         :param capture_json: parse stdout as JSON if True
         """
-        env = os.environ.copy()
-        if self.session:
-            env["BW_SESSION"] = self.session
         full_cmd = [self.bw_cmd] + cmd
         logger.debug(f"Running command: {' '.join(full_cmd)}")
-        result = subprocess.run(
-            full_cmd, text=True, capture_output=True, check=True, env=env
-        )
+        # Keep stdout as bytes so JSON can be parsed without decoding it first
+        result = subprocess.run(full_cmd, capture_output=True, check=True, env=self._session_env())
 
         if result.returncode != 0:
-            logger.error(f"Bitwarden CLI error: {result.stderr.strip()}")
-            raise BitwardenError(result.stderr.strip())
+            err = result.stderr.decode("utf-8", "replace").strip()
+            logger.error(f"Bitwarden CLI error: {err}")
+            raise BitwardenError(err)
 
-        output = result.stdout.strip()
         if capture_json:
             try:
-                return json.loads(output)
+                return _json_loads(result.stdout)
             except json.JSONDecodeError:
-                logger.error(f"Failed to parse JSON output: {output}")
+                logger.error(f"Failed to parse JSON output: {result.stdout[:200]!r}")
                 raise BitwardenError("Failed to parse JSON output")
         else:
-            return output
+            return result.stdout.decode("utf-8").strip()
+
+    # -------------------------------
+    # bw serve daemon
+    # -------------------------------
+    def _start_server(self) -> None:
+        """
+        Spawn a single `bw serve` process bound to localhost, so item operations
+        do not pay a Node startup per call.
+        """
+        with self._serve_lock:
+            if self._serve_proc is None or self._serve_proc.poll() is not None:
+                self._spawn_server()
+
+    def _spawn_server(self) -> None:
+        """Launch bw serve and wait until it accepts connections (caller holds _serve_lock)."""
+        # Connections to a previous daemon are useless now
+        while self._idle:
+            self._idle.pop().close()
+
+        # bw serve echoes the requested port rather than the bound one, so pick a free port here
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind((SERVE_HOST, 0))
+            port = sock.getsockname()[1]
+
+        cmd = [self.bw_cmd, "serve", "--hostname", SERVE_HOST, "--port", str(port)]
+        logger.debug(f"Running command: {' '.join(cmd)}")
+        # A pipe nobody drains would eventually block the daemon, so stderr goes to an
+        # anonymous file that is only read if startup fails; the child keeps its own handle
+        with tempfile.TemporaryFile("w+") as err_file:
+            proc = subprocess.Popen(
+                cmd,
+                stdout=subprocess.DEVNULL,
+                stderr=err_file,
+                text=True,
+                env=self._session_env(),
+            )
+
+            # Wait until our daemon answers on the port; another process may have taken it
+            # between picking the port and bw serve binding it
+            deadline = time.monotonic() + SERVE_STARTUP_TIMEOUT
+            while True:
+                if proc.poll() is not None:
+                    err_file.seek(0)
+                    err = err_file.read().strip()
+                    logger.error(f"bw serve exited early: {err}")
+                    raise BitwardenError(err or "bw serve exited early")
+                if self._serve_ready(port) and proc.poll() is None:
+                    break
+                if time.monotonic() > deadline:
+                    proc.kill()
+                    proc.wait()
+                    raise BitwardenError("Timed out waiting for bw serve to start")
+                time.sleep(0.1)
+
+        self._serve_proc = proc
+        self._serve_port = port
+        logger.debug(f"bw serve listening on {SERVE_HOST}:{port}")
+
+    @staticmethod
+    def _serve_ready(port: int) -> bool:
+        """Return True if a bw serve daemon answers GET /status on the given port."""
+        conn = http.client.HTTPConnection(SERVE_HOST, port, timeout=5)
+        try:
+            conn.request("GET", "/status")
+            result = _json_loads(conn.getresponse().read())
+            return isinstance(result, dict) and bool(result.get("success"))
+        except (OSError, http.client.HTTPException, ValueError):
+            return False
+        finally:
+            conn.close()
+
+    def close(self) -> None:
+        """Stop the bw serve daemon if it is running"""
+        while self._idle:
+            self._idle.pop().close()
+        if self._serve_proc is not None:
+            if self._serve_proc.poll() is None:
+                self._serve_proc.terminate()
+                try:
+                    self._serve_proc.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    self._serve_proc.kill()
+                    self._serve_proc.wait()
+            self._serve_proc = None
+            self._serve_port = None
+
+    def _send(
+        self, method: str, path: str, payload: Any = None
+    ) -> tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        """
+        Send a request to the bw serve daemon and return the connection with its unread response.
+        Hand the connection back with _release once the response has been consumed.
+        :param method: HTTP method, e.g., "GET"
+        :param path: endpoint path, e.g., "/list/object/items"
+        :param payload: JSON-serializable request body (optional)
+        """
+        self._start_server()
+        body = _json_dumps(payload) if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        logger.debug(f"Requesting: {method} {path}")
+        try:
+            conn = self._idle.pop()
+            reused = True
+        except IndexError:
+            conn = http.client.HTTPConnection(SERVE_HOST, self._serve_port, timeout=SERVE_REQUEST_TIMEOUT)
+            reused = False
+
+        # Node drops idle keep-alive connections, so retry once on a fresh socket.
+        # POST/PUT are only retried when a reused socket failed before the request was sent,
+        # otherwise the daemon may already have applied the write.
+        idempotent = method in ("GET", "DELETE")
+        for attempt in range(2):
+            sent = False
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                sent = True
+                return conn, conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if attempt or not (idempotent or (reused and not sent)):
+                    raise BitwardenError(f"bw serve connection lost on {method} {path}")
+            except TimeoutError:
+                conn.close()
+                raise BitwardenError(f"bw serve timed out on {method} {path}")
+
+    def _release(self, conn: http.client.HTTPConnection, response: http.client.HTTPResponse) -> None:
+        """Return a connection to the idle pool, or close it if its response was not fully read."""
+        if response.isclosed():
+            self._idle.append(conn)
+        else:
+            conn.close()
+
+    def _parse(self, method: str, path: str, response: http.client.HTTPResponse) -> Any:
+        """Read a bw serve response and return its "data" member."""
+        raw = response.read()
+        try:
+            result = _json_loads(raw)
+        except json.JSONDecodeError:  # orjson.JSONDecodeError subclasses it
+            logger.error(f"Failed to parse JSON output: {raw[:200]!r}")
+            raise BitwardenError("Failed to parse JSON output")
+
+        if not result.get("success"):
+            message = result.get("message") or f"HTTP {response.status}"
+            logger.error(f"Bitwarden serve error on {method} {path}: {message}")
+            raise BitwardenError(message)
+        return result.get("data")
+
+    def _request(self, method: str, path: str, payload: Any = None) -> Any:
+        """Send a request to the bw serve daemon and return its "data" member."""
+        conn, response = self._send(method, path, payload)
+        try:
+            return self._parse(method, path, response)
+        finally:
+            self._release(conn, response)
 
     # -------------------------------
     # Core API methods
     # -------------------------------
     def logout(self) -> None:
         """Logout and clear session"""
+        self.close()
         self._run(["logout"], capture_json=False)
         self.session = None
+        self._env = None
         logger.info("Logged out successfully")
 
     def status(self) -> dict[str, Any]:
@@ -158,13 +356,10 @@ class BitwardenClient:
         Unlock vault with master password or API key secret.
         Returns session token.
         """
-        env = os.environ.copy()
-        env["BW_SESSION"] = self.session
-
         cmd = [self.bw_cmd, "unlock", password, "--raw"]
         try:
             result = subprocess.run(
-                cmd, capture_output=True, text=True, check=True, env=env
+                cmd, capture_output=True, text=True, check=True, env=self._session_env()
             )
         except subprocess.CalledProcessError as e:
             logger.error(
@@ -173,59 +368,94 @@ class BitwardenClient:
             self.logout()
             raise BitwardenError(e.stderr.strip())
 
+        # A running daemon holds the previous session
+        self.close()
         self.session = result.stdout.strip()
         logger.info("Vault unlocked successfully")
         return self.session
 
     def list_items(self) -> list[dict[str, Any]]:
         """Return all vault items as list of dicts"""
-        return self._run(["list", "items"])
+        return self._request("GET", "/list/object/items")["data"]
+
+    def iter_items(self) -> Iterator[dict[str, Any]]:
+        """
+        Yield vault items one by one while bw serve is still sending them.
+        Falls back to list_items when ijson is not installed.
+        """
+        if ijson is None:
+            yield from self.list_items()
+            return
+
+        path = "/list/object/items"
+        conn, response = self._send("GET", path)
+        try:
+            if response.status != 200:
+                # bw serve reports failures as a small JSON error body
+                self._parse("GET", path, response)
+                raise BitwardenError(f"HTTP {response.status}")
+            yield from ijson.items(response, "data.data.item", use_float=True)
+        finally:
+            # An abandoned or broken stream leaves unread bytes, so that connection is dropped
+            self._release(conn, response)
 
     def get_item(self, item_id: str) -> dict[str, Any]:
         """Return a single item by id"""
-        return self._run(["get", "item", item_id])
+        return self._request("GET", f"/object/item/{item_id}")
 
     def create_item(self, payload: dict[str, Any]) -> dict[str, Any]:
         """Create a new item from a dictionary payload"""
-        proc = subprocess.Popen(
-            [self.bw_cmd, "create", "item", "--raw"],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            env={
-                **os.environ,
-                **({"BW_SESSION": self.session} if self.session else {}),
-            },
-        )
-        out, err = proc.communicate(json.dumps(payload))
-        if proc.returncode != 0:
-            logger.error(f"Error creating item: {err.strip()}")
-            raise BitwardenError(err.strip())
-        return json.loads(out)
+        return self._request("POST", "/object/item", payload)
 
     def edit_item(self, item_id: str, payload: dict[str, Any]) -> dict[str, Any]:
         """Edit an existing item by ID"""
-        proc = subprocess.Popen(
-            [self.bw_cmd, "edit", "item", item_id, "--raw"],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            env={
-                **os.environ,
-                **({"BW_SESSION": self.session} if self.session else {}),
-            },
-        )
-        out, err = proc.communicate(json.dumps(payload))
-        if proc.returncode != 0:
-            logger.error(f"Error editing item {item_id}: {err.strip()}")
-            raise BitwardenError(err.strip())
-        return json.loads(out)
+        return self._request("PUT", f"/object/item/{item_id}", payload)
+
+    async def acreate_item(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """Create a new item without blocking the event loop"""
+        return await asyncio.to_thread(self.create_item, payload)
+
+    async def aedit_item(self, item_id: str, payload: dict[str, Any]) -> dict[str, Any]:
+        """Edit an existing item without blocking the event loop"""
+        return await asyncio.to_thread(self.edit_item, item_id, payload)
+
+    def create_items(
+        self, payloads: list[dict[str, Any]], max_workers: int = 4
+    ) -> list[dict[str, Any] | BaseException]:
+        """
+        Create many items, keeping up to max_workers requests in flight.
+        Returns one entry per payload, in order: the created item, or the exception that call raised.
+        """
+        return asyncio.run(self._fan_out(self.acreate_item, [(p,) for p in payloads], max_workers))
+
+    def edit_items(
+        self, edits: list[tuple[str, dict[str, Any]]], max_workers: int = 4
+    ) -> list[dict[str, Any] | BaseException]:
+        """
+        Edit many items given as (item_id, payload) pairs, keeping up to max_workers requests in flight.
+        Returns one entry per edit, in order: the edited item, or the exception that call raised.
+        """
+        return asyncio.run(self._fan_out(self.aedit_item, edits, max_workers))
+
+    @staticmethod
+    async def _fan_out(
+        func: Callable[..., Awaitable[Any]], calls: list[tuple], max_workers: int
+    ) -> list[Any]:
+        """
+        Await func(*args) for every args tuple with bounded concurrency, preserving order.
+        A failing call yields its exception in place, so the other writes still run and are reported.
+        """
+        sem = asyncio.Semaphore(max_workers)
+
+        async def bounded(args: tuple) -> Any:
+            async with sem:
+                return await func(*args)
+
+        return await asyncio.gather(*(bounded(args) for args in calls), return_exceptions=True)
 
     def delete_item(self, item_id: str) -> None:
         """Delete an item by ID"""
-        self._run(["delete", "item", item_id], capture_json=False)
+        self._request("DELETE", f"/object/item/{item_id}")
         logger.info(f"Deleted item {item_id}")
 
     @staticmethod
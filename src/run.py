@@ -1,5 +1,7 @@
-import os
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 from bw_client import BitwardenClient
 from vault_sync import SyncPlanner
 
@@ -12,6 +14,20 @@ def require_env(name: str) -> str:
         raise RuntimeError(f"Missing required environment variable: {name}")
     return val
 
+def connect(
+    label: str,
+    bw_cmd: str,
+    server: str | None,
+    client_id: str,
+    client_secret: str,
+    password: str,
+) -> BitwardenClient:
+    logger.info(f"🔐 Connecting to {label} vault...")
+    client = BitwardenClient(bw_cmd=bw_cmd, server=server, client_id=client_id, client_secret=client_secret, use_api_key=True)
+    client.login()
+    client.unlock(password)
+    return client
+
 def main():
     # ✅ Required for both vaults
     src_client_id = require_env("SRC_BW_CLIENT_ID")
@@ -24,20 +40,21 @@ def main():
     dst_pass = require_env("DST_BW_PASSWORD")
     dst_server = os.getenv("DST_BW_SERVER")  # optional
 
-    # Create clients
-    logger.info("🔐 Connecting to source vault...")
-    source = BitwardenClient(bw_cmd='bw-src', server=src_server, client_id=src_client_id, client_secret=src_client_secret, use_api_key=True)
-    source.login()
-    source.unlock(src_pass)
-
-    logger.info("🔐 Connecting to destination vault...")
-    destination = BitwardenClient(bw_cmd='bw-dest', server=dst_server, client_id=dst_client_id, client_secret=dst_client_secret, use_api_key=True)
-    destination.login()
-    destination.unlock(dst_pass)
+    # Create clients; each vault has its own bw config dir, so both can log in at once
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        src_future = executor.submit(connect, "source", "bw-src", src_server, src_client_id, src_client_secret, src_pass)
+        dst_future = executor.submit(connect, "destination", "bw-dest", dst_server, dst_client_id, dst_client_secret, dst_pass)
+        source, destination = src_future.result(), dst_future.result()
 
     # Run dry-run plan
-    planner = SyncPlanner(source, destination)
-    to_create, to_update, to_delete = planner.plan()
+    # Optional: reuse item fingerprints between runs (file is written owner-only)
+    planner = SyncPlanner(source, destination, cache_dir=os.getenv("WARDENSYNC_CACHE_DIR"))
+    try:
+        to_create, to_update, to_delete = planner.plan()
+    finally:
+        # Stop the bw serve daemons
+        source.close()
+        destination.close()
 
     logger.info("\n✅ DRY RUN RESULT")
     logger.info("-------------------------------")
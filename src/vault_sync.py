@@ -1,174 +1,369 @@
+import os
+import json
 import logging
 import hashlib
-import json
-import copy
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
 from bw_client import BitwardenClient
 
 logger = logging.getLogger(__name__)
 
+# Bound once so the sync_id helpers skip the class attribute lookup per call
+_get_custom_field = BitwardenClient.get_custom_field
+_set_custom_field = BitwardenClient.set_custom_field
+
 SYNC_FIELD = "sync_id"
 IGNORED_FIELDS = {"id", "revisionDate", "creationDate", "deletedDate", "organizationId", SYNC_FIELD}
 VOLATILE_LOGIN_KEYS = {"passwordRevisionDate", "totp"}
+# Bump whenever normalization changes, so fingerprints from older runs are discarded
+FP_CACHE_VERSION = 1
+
+
+def _canon(obj: Any) -> Any:
+    """Hashable canonical form: dicts become key-sorted pairs, lists tuples, None an empty string."""
+    # Leaves are handled inline while walking a container, so only nested dicts/lists cost a frame.
+    # Exact type() checks keep this cheap and let mypyc specialize the branches.
+    t = type(obj)
+    if t is dict:
+        pairs: list[tuple[str, Any]] = []
+        append = pairs.append
+        for k, v in obj.items():
+            vt = type(v)
+            if vt is dict or vt is list:
+                v = _canon(v)
+            elif v is None:
+                v = ""
+            append((k, v))
+        pairs.sort()
+        return tuple(pairs)
+    if t is list:
+        values: list[Any] = []
+        append = values.append
+        for v in obj:
+            vt = type(v)
+            if vt is dict or vt is list:
+                v = _canon(v)
+            elif v is None:
+                v = ""
+            append(v)
+        return tuple(values)
+    return "" if obj is None else obj
+
+
+# Lowered (name, username, first URI) keyed by id(item); the item is kept alongside
+# so its id cannot be reused while the entry exists. Only set while SyncPlanner.plan runs
+_norm_keys: dict[int, tuple[dict, tuple[str, str, str]]] | None = None
+
+
+def _get_norm(item: dict[str, Any]) -> tuple[str, str, str]:
+    """Return the stripped, lowercased name, username and first URI of an item."""
+    cache = _norm_keys
+    if cache is not None:
+        entry = cache.get(id(item))
+        if entry is not None and entry[0] is item:
+            return entry[1]
+    login = item.get("login") or {}
+    uris = login.get("uris") or []
+    norm = (
+        (item.get("name") or "").strip().lower(),
+        (login.get("username") or "").strip().lower(),
+        (uris[0].get("uri") or "").strip().lower() if uris else "",
+    )
+    if cache is not None:
+        cache[id(item)] = (item, norm)
+    return norm
+
 
 class SyncPlanner:
-    def __init__(self, source_client: BitwardenClient, destination_client: BitwardenClient, max_workers: int = 8):
+    def __init__(
+        self,
+        source_client: BitwardenClient,
+        destination_client: BitwardenClient,
+        max_workers: int = 8,
+        cache_dir: str | None = None,
+    ):
         """
         :param source_client: BitwardenClient for source vault (e.g., bw-src)
         :param destination_client: BitwardenClient for destination vault (e.g., bw-dest)
+        :param cache_dir: Directory for the fingerprint cache kept between runs (opt-in, None disables it).
+            The cache holds digests of full item contents, so it is written readable by the owner only.
         """
         self.source = source_client
         self.dest = destination_client
         self.max_workers = max_workers
+        # Canonical forms keyed by id(item). Dicts cannot be weakly referenced, so each entry
+        # holds the item itself: its id cannot be recycled while cached. Only set while plan() runs.
+        self._norm_cache: dict[int, tuple[dict, tuple]] | None = None
+
+        # Fingerprints from previous runs per side: {"source"|"destination": {item id: [revisionDate, fingerprint]}}
+        self._fp_path: str | None = None
+        self._fp_stored: dict[str, dict[str, list]] = {}
+        self._fp_fresh: dict[str, dict[str, list]] = {}
+        if cache_dir:
+            vaults = "|".join(f"{c.bw_cmd}@{c.server or ''}" for c in (source_client, destination_client))
+            name = hashlib.blake2b(vaults.encode("utf-8"), digest_size=8).hexdigest()
+            self._fp_path = os.path.join(cache_dir, f"fp-{name}.json")
+            self._fp_stored = self._load_fp_cache(self._fp_path)
+
+    # -------------------------------------------------
+    # Fingerprint cache
+    # -------------------------------------------------
+    @staticmethod
+    def _load_fp_cache(path: str) -> dict[str, dict[str, list]]:
+        """Return the stored fingerprints, or an empty mapping if the file is missing, stale or unreadable."""
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable fingerprint cache {path}: {e}")
+            return {}
+        if not isinstance(data, dict) or data.get("version") != FP_CACHE_VERSION:
+            return {}
+        items = data.get("items")
+        if not isinstance(items, dict):
+            return {}
+        # Keep only well-formed [revisionDate, fingerprint] entries; anything else is recomputed
+        return {
+            side: {
+                item_id: entry
+                for item_id, entry in fps.items()
+                if isinstance(entry, list)
+                and len(entry) == 2
+                and isinstance(entry[0], str)
+                and type(entry[1]) is int
+            }
+            for side, fps in items.items()
+            if isinstance(fps, dict)
+        }
+
+    def _save_fp_cache(self) -> None:
+        """
+        Persist the fingerprints used by this plan. Items no longer seen are dropped,
+        which keeps the file bounded by the size of the vaults.
+        """
+        if not self._fp_path:
+            return
+        self._fp_stored, self._fp_fresh = self._fp_fresh, {}
+        tmp_path = f"{self._fp_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self._fp_path), mode=0o700, exist_ok=True)
+            # A leftover temp file could carry looser permissions; O_CREAT only applies the mode to new files
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": FP_CACHE_VERSION, "items": self._fp_stored}, f, separators=(",", ":"))
+            os.replace(tmp_path, self._fp_path)
+        except OSError as e:
+            logger.warning(f"Could not write fingerprint cache {self._fp_path}: {e}")
 
     # -------------------------------------------------
     # Sync ID helpers
     # -------------------------------------------------
     @staticmethod
-    def compute_sync_id(item: dict) -> str:
+    def compute_sync_id(item: dict[str, Any]) -> str:
         """Deterministic hash of name + username + first URI domain"""
-        name = (item.get("name") or "").strip().lower()
-        username = (item.get("login", {}).get("username") or "").strip().lower()
-        uris = item.get("login", {}).get("uris") or []
-        domain = ""
-        if uris:
-            uri = uris[0].get("uri", "").strip().lower()
-            domain = uri.split("//")[-1].split("/")[0]
-        return hashlib.sha256(f"{name}|{username}|{domain}".encode("utf-8")).hexdigest()
+        name, username, uri = _get_norm(item)
+        domain = uri.split("//")[-1].split("/")[0]
+        # Identifier only, not a security boundary: a 128-bit BLAKE2b digest is plenty and cheaper than SHA-256
+        return hashlib.blake2b(f"{name}|{username}|{domain}".encode("utf-8"), digest_size=16).hexdigest()
+
+    @staticmethod
+    def get_sync_id(item: dict[str, Any]) -> str:
+        return _get_custom_field(item, SYNC_FIELD)
+
+    @staticmethod
+    def set_sync_id(item: dict[str, Any], sync_id: str) -> dict:
+        return _set_custom_field(item, SYNC_FIELD, sync_id)
 
     @staticmethod
-    def get_sync_id(item: dict) -> str:
-        from bw_client import BitwardenClient
-        return BitwardenClient.get_custom_field(item, SYNC_FIELD)
+    def _ensure_sync_id(item: dict[str, Any]) -> str:
+        """Return the item's sync_id, stamping a computed one during the same walk over its fields."""
+        fields = item.get("fields") or []
+        for f in fields:
+            if f.get("name") == SYNC_FIELD:
+                if f.get("value"):
+                    return f["value"]
+                f["value"] = sync_id = SyncPlanner.compute_sync_id(item)
+                return sync_id
+        # Field not found, add new
+        sync_id = SyncPlanner.compute_sync_id(item)
+        fields.append({"name": SYNC_FIELD, "value": sync_id, "type": 0})  # type 0 = text field
+        item["fields"] = fields
+        return sync_id
 
     @staticmethod
-    def set_sync_id(item: dict, sync_id: str) -> dict:
-        from bw_client import BitwardenClient
-        return BitwardenClient.set_custom_field(item, SYNC_FIELD, sync_id)
+    def _lookup_sync_id(item: dict[str, Any]) -> str:
+        """Return the item's sync_id, or the computed one without stamping it."""
+        return SyncPlanner.get_sync_id(item) or SyncPlanner.compute_sync_id(item)
 
     @staticmethod
-    def build_key(item: dict) -> str:
-        """Used for fuzzy matching when sync_id is missing."""
-        name = (item.get("name") or "").strip().lower()
-        uri = ""
-        uris = item.get("login", {}).get("uris") or []
-        if uris:
-            uri = uris[0].get("uri", "").strip().lower()
-        return f"{name}|{uri}"
+    def build_key(item: dict[str, Any]) -> tuple[str, str]:
+        """
+        Used for fuzzy matching when sync_id is missing.
+        Returns the cached lowered (name, URI) pair, so no key string is built per call.
+        """
+        name, _, uri = _get_norm(item)
+        return name, uri
 
     # -------------------------------------------------
     # Comparison logic
     # -------------------------------------------------
-    def _normalize_item(self, item: dict) -> dict:
-        """Return a deeply normalized version of an item for stable but precise comparison."""
-        clean = copy.deepcopy(item)
-
-        # Drop ignored top-level keys
-        for k in list(clean.keys()):
+    def _normalize_item(self, item: dict[str, Any]) -> tuple:
+        """Return the canonical form of an item, computing it at most once per plan."""
+        cache = self._norm_cache
+        if cache is None:
+            return self._do_normalize(item)
+        key = id(item)
+        entry = cache.get(key)
+        if entry is not None and entry[0] is item:
+            return entry[1]
+        canon = self._do_normalize(item)
+        cache[key] = (item, canon)
+        return canon
+
+    def _do_normalize(self, item: dict[str, Any]) -> tuple:
+        """
+        Return a hashable canonical form of an item for stable but precise comparison.
+        Built in a single pass over the item, which is never copied or mutated.
+        """
+        clean: dict[str, Any] = {}
+        for k, v in item.items():
+            # Drop ignored top-level keys
             if k in IGNORED_FIELDS:
-                clean.pop(k, None)
-
-        # --- Normalize login
-        login = clean.get("login")
-        if isinstance(login, dict):
-            for k in list(login.keys()):
-                if k in VOLATILE_LOGIN_KEYS:
-                    login.pop(k, None)
-            # Normalize URIs deterministically
-            uris = login.get("uris")
-            if isinstance(uris, list):
-                norm_uris = []
-                for u in uris:
-                    if not isinstance(u, dict):
+                continue
+
+            # --- Normalize login
+            if k == "login" and isinstance(v, dict):
+                login: dict[str, Any] = {}
+                for lk, lv in v.items():
+                    if lk in VOLATILE_LOGIN_KEYS:
                         continue
-                    normalized_uri = {
-                        "uri": (u.get("uri") or "").strip().lower(),
-                        "match": u.get("match", 0),  # default match=0 if missing
-                        "port": u.get("port", None),
-                    }
-                    norm_uris.append(normalized_uri)
-                # Sort deterministically by URI and then by match
-                login["uris"] = sorted(norm_uris, key=lambda x: (x["uri"], x.get("match", 0)))
-            clean["login"] = login
-
-        # --- Normalize custom fields
-        fields = clean.get("fields")
-        if isinstance(fields, list):
-            filtered = [f for f in fields if f.get("name") != SYNC_FIELD]
-            for f in filtered:
-                if "value" in f and f["value"] is None:
-                    f["value"] = ""
-            clean["fields"] = sorted(filtered, key=lambda f: f.get("name", ""))
-
-        # --- Normalize notes and text
-        if clean.get("notes") is None:
-            clean["notes"] = ""
-
-        # --- Normalize all None values deeply
-        def normalize_values(obj):
-            if isinstance(obj, dict):
-                return {k: normalize_values(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [normalize_values(v) for v in obj]
-            elif obj is None:
-                return ""
-            return obj
-
-        clean = normalize_values(clean)
-        return clean
-
-    def _items_differ(self, src: dict, dst: dict) -> bool:
-        src_norm = self._normalize_item(src)
-        dst_norm = self._normalize_item(dst)
-
-        src_json = json.dumps(src_norm, sort_keys=True, separators=(",", ":"))
-        dst_json = json.dumps(dst_norm, sort_keys=True, separators=(",", ":"))
-
-        if src_json != dst_json:
+                    # Normalize URIs deterministically
+                    if lk == "uris" and isinstance(lv, list):
+                        norm_uris = [
+                            {
+                                "uri": (u.get("uri") or "").strip().lower(),
+                                "match": u.get("match", 0),  # default match=0 if missing
+                                "port": u.get("port", None),
+                            }
+                            for u in lv
+                            if isinstance(u, dict)
+                        ]
+                        # Sort deterministically by URI and then by match
+                        norm_uris.sort(key=lambda x: (x["uri"], x["match"]))
+                        login[lk] = _canon(norm_uris)
+                    else:
+                        login[lk] = _canon(lv)
+                clean[k] = tuple(sorted(login.items()))
+
+            # --- Normalize custom fields
+            elif k == "fields" and isinstance(v, list):
+                filtered = [f for f in v if f.get("name") != SYNC_FIELD]
+                filtered.sort(key=lambda f: f.get("name", ""))
+                clean[k] = _canon(filtered)
+
+            else:
+                clean[k] = _canon(v)
+
+        # --- Normalize notes and text (None is already mapped to "")
+        clean.setdefault("notes", "")
+
+        return tuple(sorted(clean.items()))
+
+    def _fingerprint(self, item: dict[str, Any]) -> int:
+        """64-bit digest of the item's canonical form, as kept in the fingerprint cache."""
+        digest = hashlib.blake2b(repr(self._normalize_item(item)).encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big")
+
+    def _stored_fingerprint(self, item: dict[str, Any], side: str) -> int | None:
+        """Fingerprint from a previous run, if the item's revisionDate has not changed since."""
+        stored = self._fp_stored.get(side, {}).get(item.get("id") or "")
+        if stored and stored[0] == item.get("revisionDate"):
+            return stored[1]
+        return None
+
+    def _record_fingerprint(self, item: dict[str, Any], side: str, fp: int | None) -> None:
+        """Keep the item's fingerprint for the next run, computing it when none was stored."""
+        item_id, revision = item.get("id"), item.get("revisionDate")
+        if not (item_id and revision):
+            return
+        if fp is None:
+            fp = self._fingerprint(item)
+        self._fp_fresh.setdefault(side, {})[item_id] = [revision, fp]
+
+    def _items_differ(self, src: dict[str, Any], dst: dict[str, Any]) -> bool:
+        if self._fp_path:
+            # Unchanged revisions on both sides let the stored fingerprints stand in for the items
+            src_fp = self._stored_fingerprint(src, "source")
+            dst_fp = self._stored_fingerprint(dst, "destination")
+            if src_fp is not None and dst_fp is not None:
+                differ = src_fp != dst_fp
+            else:
+                differ = self._normalize_item(src) != self._normalize_item(dst)
+            self._record_fingerprint(src, "source", src_fp)
+            self._record_fingerprint(dst, "destination", dst_fp)
+        else:
+            differ = self._normalize_item(src) != self._normalize_item(dst)
+
+        if differ and logger.isEnabledFor(logging.DEBUG):
             logger.debug(f"🧩 Difference detected for {src.get('name')}")
-            logger.debug(f"SRC: {src_json}")
-            logger.debug(f"DST: {dst_json}")
-            return True
-        return False
+            logger.debug(f"SRC: {self._normalize_item(src)}")
+            logger.debug(f"DST: {self._normalize_item(dst)}")
+        return differ
 
     # -------------------------------------------------
-    # Fuzzy matching (parallel)
+    # Fuzzy matching
     # -------------------------------------------------
     def _match_unmatched(
         self, src_unmatched: list[dict], dst_unmatched: list[dict]
     ) -> tuple[list[tuple[dict, dict]], list[dict]]:
-        """Parallel fuzzy match: returns (update_pairs, create_list)."""
+        """Fuzzy match: returns (update_pairs, create_list)."""
         dst_lookup = {self.build_key(d): d for d in dst_unmatched}
-        update_pairs = []
-        create_list = []
+        update_pairs: list[tuple[dict, dict]] = []
+        create_list: list[dict] = []
+        matched_dst_ids: set[int] = set()
 
-        def match_one(src):
-            key = self.build_key(src)
-            dst = dst_lookup.get(key)
+        for src in src_unmatched:
+            dst = dst_lookup.get(self.build_key(src))
             if dst:
-                return ("update", src, dst)
-            else:
-                return ("create", src, None)
-
-        results = []
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = [executor.submit(match_one, s) for s in src_unmatched]
-            for f in as_completed(futures):
-                results.append(f.result())
-
-        for action, src, dst in results:
-            if action == "update" and dst:
                 update_pairs.append((src, dst))
-                if dst in dst_unmatched:
-                    dst_unmatched.remove(dst)
-            elif action == "create":
+                matched_dst_ids.add(id(dst))
+            else:
                 create_list.append(src)
 
+        # Drop matched destinations in one pass instead of a list.remove() per match
+        if matched_dst_ids:
+            dst_unmatched[:] = [d for d in dst_unmatched if id(d) not in matched_dst_ids]
+
         return update_pairs, create_list
 
     # -------------------------------------------------
     # Main planning logic
     # -------------------------------------------------
+    def _index_items(self, items: Iterable[dict], stamp: bool) -> tuple[dict[str, dict], list[dict]]:
+        """
+        Index items by sync_id as they arrive: returns (sync_id map, unmatched list).
+        :param stamp: write the computed sync_id into items that lack one (source side)
+        """
+        item_map: dict[str, dict[str, Any]] = {}
+        unmatched: list[dict[str, Any]] = []
+        # Resolve the sync_id getter once rather than on every iteration
+        _sid = self._ensure_sync_id if stamp else self._lookup_sync_id
+
+        for item in items:
+            sid = _sid(item)
+            if sid:
+                item_map[sid] = item
+            else:
+                unmatched.append(item)
+        return item_map, unmatched
+
     def plan(self) -> tuple[list[dict], list[tuple[dict, dict]], list[dict]]:
         """
         Compute the sync plan:
@@ -176,28 +371,26 @@ class SyncPlanner:
           - to_update: (src, dst) pairs that must be updated
           - to_delete: destination items missing from source
         """
+        global _norm_keys
+        # Per-item caches exist only for this call, so no items are retained between plans
+        self._norm_cache, _norm_keys = {}, {}
+        self._fp_fresh.clear()
+        try:
+            result = self._build_plan()
+        finally:
+            self._norm_cache = _norm_keys = None
+        self._save_fp_cache()
+        return result
+
+    def _build_plan(self) -> tuple[list[dict], list[tuple[dict, dict]], list[dict]]:
+        """Fetch both vaults and compute the plan; see plan()."""
         logger.info("📥 Fetching source and destination items...")
-        src_items = self.source.list_items()
-        dst_items = self.dest.list_items()
-
-        # Maps and unmatched lists
-        src_map, dst_map = {}, {}
-        src_unmatched, dst_unmatched = [], []
-
-        for s in src_items:
-            sid = self.get_sync_id(s) or self.compute_sync_id(s)
-            self.set_sync_id(s, sid)
-            if sid:
-                src_map[sid] = s
-            else:
-                src_unmatched.append(s)
-
-        for d in dst_items:
-            sid = self.get_sync_id(d) or self.compute_sync_id(d)
-            if sid:
-                dst_map[sid] = d
-            else:
-                dst_unmatched.append(d)
+        # The two vaults are independent, so overlap their network round-trips.
+        # Items are indexed as they are streamed instead of materializing both lists first.
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            src_future = executor.submit(self._index_items, self.source.iter_items(), True)
+            dst_future = executor.submit(self._index_items, self.dest.iter_items(), False)
+            (src_map, src_unmatched), (dst_map, dst_unmatched) = src_future.result(), dst_future.result()
 
         to_create: list[dict] = []
         to_update: list[tuple[dict, dict]] = []
@@ -205,45 +398,32 @@ class SyncPlanner:
 
         # 1. Match by sync_id
         logger.info("🔍 Matching by sync_id...")
-        matched_pairs = []
+        matched_pairs: list[tuple[dict, dict]] = []
+        dst_get = dst_map.get
         for sid, src in src_map.items():
-            dst = dst_map.get(sid)
+            dst = dst_get(sid)
             if dst:
                 matched_pairs.append((src, dst))
             else:
                 to_create.append(src)
 
-        # Parallel compare matched pairs
-        logger.info("🧮 Comparing matched items (parallel)...")
-        def compare_pair(pair):
-            src_item, dst_item = pair
-            diff = self._items_differ(src_item, dst_item)
-            return (src_item, dst_item, diff)
-
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = [executor.submit(compare_pair, p) for p in matched_pairs]
-            for f in as_completed(futures):
-                src_item, dst_item, diff = f.result()
-                if diff:
-                    to_update.append((src_item, dst_item))
-
-        # 2. Identify deletions (missing in source)
-        for sid, dst in dst_map.items():
-            if sid not in src_map:
-                to_delete.append(dst)
+        # Compare matched pairs; this is pure-Python work, so threads would only add overhead under the GIL
+        logger.info("🧮 Comparing matched items...")
+        _differ = self._items_differ
+        to_update.extend((s, d) for s, d in matched_pairs if _differ(s, d))
+
+        # 2. Identify deletions (missing in source) via a C-level set difference of the key views,
+        # listed in destination order so the plan does not depend on the hash seed
+        missing_sids = dst_map.keys() - src_map.keys()
+        to_delete.extend(dst for sid, dst in dst_map.items() if sid in missing_sids)
 
         # 3. Fuzzy match for items without sync_id
         logger.info("🧩 Running fuzzy match for unmatched items...")
         fuzzy_updates, fuzzy_creates = self._match_unmatched(src_unmatched, dst_unmatched)
 
         # Filter fuzzy updates by diff
-        logger.info("🧮 Comparing fuzzy matched items (parallel)...")
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = [executor.submit(compare_pair, p) for p in fuzzy_updates]
-            for f in as_completed(futures):
-                src_item, dst_item, diff = f.result()
-                if diff:
-                    to_update.append((src_item, dst_item))
+        logger.info("🧮 Comparing fuzzy matched items...")
+        to_update.extend((s, d) for s, d in fuzzy_updates if _differ(s, d))
 
         # Remaining dst_unmatched = deletions
         to_delete.extend(dst_unmatched)